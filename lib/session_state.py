@@ -0,0 +1,62 @@
+import asyncio
+import weakref
+from dataclasses import dataclass, replace
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class SessionSnapshot:
+    """Immutable view of one client's session state at a given version."""
+    version: int = 0
+    testing_url: Optional[str] = None
+    testing_account: Optional[str] = None
+    may_need_a_testing_account: Optional[bool] = False
+    # (url, may_need_a_testing_account) last written to the knowledge backend,
+    # and the snapshot version that recorded the write
+    persisted_testing_url: Optional[Tuple[str, bool]] = None
+    persisted_at_version: int = 0
+
+
+class SessionState:
+    """Per-session state: lock-free snapshot reads, lock-protected writes."""
+
+    def __init__(self):
+        self._snapshot = SessionSnapshot()
+        self.lock = asyncio.Lock()
+
+    @property
+    def snapshot(self) -> SessionSnapshot:
+        return self._snapshot
+
+    def update(self, **changes) -> SessionSnapshot:
+        """Publish a new snapshot. Callers must hold ``lock``."""
+        if not self.lock.locked():
+            raise RuntimeError("SessionState.update() requires holding the session lock")
+        self._snapshot = replace(self._snapshot, version=self._snapshot.version + 1, **changes)
+        return self._snapshot
+
+
+class SessionStore:
+    """Maps MCP client sessions to their state and merges identical in-flight writes."""
+
+    def __init__(self):
+        # keyed by the session object so state is dropped once the client disconnects
+        self._sessions: "weakref.WeakKeyDictionary[Any, SessionState]" = weakref.WeakKeyDictionary()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def get(self, session: Any) -> SessionState:
+        state = self._sessions.get(session)
+        if state is None:
+            state = SessionState()
+            self._sessions[session] = state
+        return state
+
+    async def coalesce(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run ``factory`` once for all concurrent callers sharing ``key``."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield so one cancelled caller does not abort the write for the others
+        return await asyncio.shield(task)
@@ -0,0 +1 @@
+"""Load-testing tools for the Stably MCP server; run with ``python -m loadtest``."""
@@ -0,0 +1,340 @@
+"""Simulate many concurrent MCP agents against the Stably MCP server.
+
+Runs the server in-process (memory transport) or as a subprocess over SSE /
+streamable HTTP, points it at a local fake Stably backend (loadtest/fake_backend.py)
+and reports throughput, tail latency, event-loop lag, memory growth and open
+sockets for each session count, e.g.:
+
+    python -m loadtest --transport sse --sessions 10,50,200 --scenario onboarding
+
+With the HTTP transports the resource metrics are the server's own. With the
+memory transport the server shares this process with the simulated clients, so
+lag, RSS and sockets are totals for the whole load-test process.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+from fastmcp import Client
+
+from loadtest.metrics import count_sockets, percentile, read_rss, sample_loop_lag
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ToolCall = Tuple[str, dict]
+
+
+def onboarding_scenario(burst: int) -> List[List[ToolCall]]:
+    """set_testing_url -> set_basic_user_flows -> a burst of parallel add_e2e_test calls."""
+    return [
+        [("set_testing_url", {"user_provided_url": "https://example.com", "may_need_a_testing_account": False})],
+        [("set_basic_user_flows", {"list_of_basic_user_flows": [
+            "When a user signs up, they land on the onboarding checklist and must finish the first step to continue.",
+        ]})],
+        [("add_e2e_test", {"multi_step_test_description": [
+            "Open the home page", "Click on 'Sign up'", f"Fill the form and submit ({i})",
+        ]}) for i in range(burst)],
+    ]
+
+
+def knowledge_scenario(burst: int) -> List[List[ToolCall]]:
+    """Parallel knowledge writes, as an agent does after scanning a codebase."""
+    return [
+        [("set_uncommon_ux_designs", {"list_of_uncommon_ux_designs": [
+            f"The settings page saves automatically, there is no save button ({i})."]}),
+         ("set_basic_user_flows", {"list_of_basic_user_flows": [
+             f"Checkout requires choosing a shipping method before payment ({i})."]}),
+         ("set_user_preferences", {"list_of_user_preferences": [
+             f"Prefer asserting on visible text over element ids ({i})."]})]
+        for i in range(burst)
+    ]
+
+
+def account_scenario(burst: int) -> List[List[ToolCall]]:
+    """Overlapping url/account updates followed by test creation."""
+    return [
+        [("set_testing_url", {"user_provided_url": "https://example.com/app", "may_need_a_testing_account": True}),
+         ("set_testing_account", {"testing_account": "user: qa@example.com, password: hunter2"})] * burst,
+        [("add_e2e_test", {"multi_step_test_description": [
+            "Log in with the testing account", f"Open the dashboard ({i})"]}) for i in range(burst)],
+    ]
+
+
+SCENARIOS = {
+    "onboarding": onboarding_scenario,
+    "knowledge": knowledge_scenario,
+    "account": account_scenario,
+}
+
+
+@dataclass
+class ServerHandle:
+    target: object
+    pid: int
+    # scope of the resource metrics: "server", or "process" when clients share it
+    scope: str
+    lag_url: Optional[str] = None
+
+
+@dataclass
+class StepResult:
+    sessions: int
+    duration: float = 0.0
+    latencies: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: Counter = field(default_factory=Counter)
+    loop_lag: List[float] = field(default_factory=list)
+    rss: List[int] = field(default_factory=list)
+    sockets: List[int] = field(default_factory=list)
+    backend_calls: Dict[str, int] = field(default_factory=dict)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_for_port(host: str, port: int, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if process.poll() is not None:
+                raise Exception(f"{' '.join(process.args)} exited with code {process.returncode}, see stderr above")
+            if time.monotonic() > deadline:
+                raise Exception(f"Timed out waiting for {host}:{port}")
+            await asyncio.sleep(0.1)
+
+
+def sample_resources(result: StepResult, pid: int):
+    rss, sockets = read_rss(pid), count_sockets(pid)
+    if rss is not None:
+        result.rss.append(rss)
+    if sockets is not None:
+        result.sockets.append(sockets)
+
+
+async def monitor(result: StepResult, pid: int, interval: float, stop: asyncio.Event):
+    """Sample RSS and open sockets of ``pid`` every ``interval`` and once more when ``stop`` is set."""
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+        sample_resources(result, pid)
+
+
+async def timed(result: StepResult, name: str, coro):
+    """Await ``coro``, recording its latency on success and counting it as an error otherwise."""
+    start = time.perf_counter()
+    try:
+        response = await coro
+    except Exception as e:
+        result.errors[f"{name}: {type(e).__name__}"] += 1
+        return None
+    result.latencies[name].append(time.perf_counter() - start)
+    return response
+
+
+async def run_agent(target, scenario: List[List[ToolCall]], iterations: int, result: StepResult, timeout: float):
+    start = time.perf_counter()
+    try:
+        # entered with ``async with`` so the client's task group opens and closes in this task
+        async with Client(target) as client:
+            result.latencies["connect"].append(time.perf_counter() - start)
+            for _ in range(iterations):
+                for stage in scenario:
+                    await asyncio.gather(*[
+                        timed(result, name, asyncio.wait_for(client.call_tool(name, args), timeout))
+                        for name, args in stage
+                    ])
+    except Exception as e:
+        result.errors[f"session: {type(e).__name__}"] += 1
+
+
+async def fetch_json(url: str) -> dict:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as response:
+            return await response.json()
+
+
+async def run_step(args, server: ServerHandle, backend_url: str, sessions: int) -> StepResult:
+    result = StepResult(sessions=sessions)
+    scenario = SCENARIOS[args.scenario](args.burst)
+    calls_before = (await fetch_json(f"{backend_url}/_stats"))["calls"]
+    if server.lag_url:
+        # drop samples taken before this step
+        await fetch_json(server.lag_url)
+        lag_sampler = None
+    else:
+        lag_sampler = asyncio.create_task(sample_loop_lag(result.loop_lag, args.sample_interval))
+    # baseline taken before any agent connects, so growth is measured from an idle server
+    sample_resources(result, server.pid)
+    stop = asyncio.Event()
+    monitor_task = asyncio.create_task(monitor(result, server.pid, args.sample_interval, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        run_agent(server.target, scenario, args.iterations, result, args.timeout) for _ in range(sessions)
+    ])
+    result.duration = time.perf_counter() - start
+    stop.set()
+    await monitor_task
+    if lag_sampler:
+        lag_sampler.cancel()
+    else:
+        result.loop_lag = (await fetch_json(server.lag_url))["loop_lag"]
+    calls_after = (await fetch_json(f"{backend_url}/_stats"))["calls"]
+    result.backend_calls = {
+        k: v - calls_before.get(k, 0) for k, v in calls_after.items() if v - calls_before.get(k, 0)
+    }
+    return result
+
+
+def summarize(result: StepResult, scope: str) -> dict:
+    # latencies only hold successful calls, so failures and timeouts never count towards throughput
+    calls = sum(len(values) for name, values in result.latencies.items() if name != "connect")
+    return {
+        "sessions": result.sessions,
+        "metrics_scope": scope,
+        "successful_tool_calls": calls,
+        "errors": dict(result.errors),
+        "duration_s": round(result.duration, 3),
+        "throughput_calls_per_s": round(calls / result.duration, 2) if result.duration else 0.0,
+        "latency_ms": {
+            name: {
+                "p50": round(percentile(values, 50) * 1000, 1),
+                "p95": round(percentile(values, 95) * 1000, 1),
+                "p99": round(percentile(values, 99) * 1000, 1),
+                "max": round(max(values) * 1000, 1),
+            }
+            for name, values in sorted(result.latencies.items()) if values
+        },
+        "loop_lag_ms": {
+            "p99": round(percentile(result.loop_lag, 99) * 1000, 1),
+            "max": round(max(result.loop_lag, default=0.0) * 1000, 1),
+        },
+        "rss_mb": {
+            "start": round(result.rss[0] / 2**20, 1),
+            "peak": round(max(result.rss) / 2**20, 1),
+            "end": round(result.rss[-1] / 2**20, 1),
+        } if result.rss else None,
+        "open_sockets": {
+            "start": result.sockets[0],
+            "peak": max(result.sockets),
+            "end": result.sockets[-1],
+        } if result.sockets else None,
+        "backend_calls": result.backend_calls,
+    }
+
+
+def print_summary(summary: dict):
+    print(f"\n=== {summary['sessions']} sessions ===")
+    print(f"successful tool calls: {summary['successful_tool_calls']} in {summary['duration_s']}s "
+          f"({summary['throughput_calls_per_s']} calls/s), errors: {sum(summary['errors'].values())}")
+    for error, count in summary["errors"].items():
+        print(f"  {error}: {count}")
+    print(f"{'operation':<26}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, lat in summary["latency_ms"].items():
+        print(f"{name:<26}{lat['p50']:>10}{lat['p95']:>10}{lat['p99']:>10}{lat['max']:>10}")
+    scope = "server" if summary["metrics_scope"] == "server" else "process (server + clients)"
+    lag = summary["loop_lag_ms"]
+    print(f"{scope} event-loop lag: p99 {lag['p99']} ms, max {lag['max']} ms")
+    if summary["rss_mb"]:
+        rss = summary["rss_mb"]
+        print(f"{scope} RSS: {rss['start']} -> {rss['end']} MB (peak {rss['peak']} MB)")
+    if summary["open_sockets"]:
+        sockets = summary["open_sockets"]
+        print(f"{scope} open sockets: {sockets['start']} -> {sockets['end']} (peak {sockets['peak']})")
+    print(f"backend calls: {sum(summary['backend_calls'].values())} "
+          + json.dumps(summary["backend_calls"], sort_keys=True))
+
+
+def start_process(cmd: List[str], env: dict) -> subprocess.Popen:
+    # stderr stays on the console so startup failures are visible
+    return subprocess.Popen(cmd, cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL)
+
+
+async def run(args):
+    backend_port = free_port()
+    backend_url = f"http://127.0.0.1:{backend_port}"
+    env = {
+        **os.environ,
+        "AUTH_BASE_URL": backend_url,
+        "API_BASE_URL": backend_url,
+        "AUTH_EMAIL": "loadtest@example.com",
+        "AUTH_PASSWORD": "loadtest",
+        "NGROK_ENABLED": "false",
+    }
+    processes = [start_process(
+        [sys.executable, "-m", "loadtest.fake_backend", "--port", str(backend_port), "--latency", str(args.backend_latency)],
+        env,
+    )]
+    try:
+        await wait_for_port("127.0.0.1", backend_port, processes[0])
+        if args.transport == "memory":
+            os.environ.update(env)
+            import main
+            server = ServerHandle(target=main.mcp, pid=os.getpid(), scope="process")
+            print("memory transport: lag, RSS and sockets include the simulated clients; "
+                  "use --transport sse or streamable-http for server-only numbers")
+        else:
+            port, stats_port = free_port(), free_port()
+            processes.append(start_process(
+                [sys.executable, "-m", "loadtest.server", "--transport", args.transport,
+                 "--port", str(port), "--stats-port", str(stats_port),
+                 "--sample-interval", str(args.sample_interval)],
+                env,
+            ))
+            await wait_for_port("127.0.0.1", port, processes[-1])
+            path = "/sse" if args.transport == "sse" else "/mcp"
+            server = ServerHandle(
+                target=f"http://127.0.0.1:{port}{path}",
+                pid=processes[-1].pid,
+                scope="server",
+                lag_url=f"http://127.0.0.1:{stats_port}/_lag",
+            )
+
+        summaries = []
+        for sessions in args.sessions:
+            summary = summarize(await run_step(args, server, backend_url, sessions), server.scope)
+            summaries.append(summary)
+            print_summary(summary)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(summaries, f, indent=2)
+    finally:
+        for process in processes:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the Stably MCP server with many concurrent agents.")
+    parser.add_argument("--transport", choices=["memory", "sse", "streamable-http"], default="memory",
+                        help="memory runs the server in this process; sse/streamable-http spawn it over HTTP")
+    parser.add_argument("--sessions", type=lambda s: [int(n) for n in s.split(",")], default=[10],
+                        help="comma separated concurrent session counts, run one after another (e.g. 10,50,200)")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="onboarding")
+    parser.add_argument("--burst", type=int, default=3, help="parallel calls per burst within a scenario")
+    parser.add_argument("--iterations", type=int, default=1, help="times each session repeats the scenario")
+    parser.add_argument("--backend-latency", type=float, default=0.0, help="seconds added to each fake backend call")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-call timeout in seconds")
+    parser.add_argument("--sample-interval", type=float, default=0.05, help="seconds between resource samples")
+    parser.add_argument("--json", help="also write the per-step summaries to this file")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,117 @@
+import argparse
+import asyncio
+import itertools
+import json
+from collections import Counter
+from typing import List, Optional
+
+from aiohttp import web
+
+# Minimal in-memory stand-in for the Stably auth and tRPC APIs, used by the loadtest CLI.
+# Serves both AUTH_BASE_URL and API_BASE_URL so the MCP server can run against it unchanged.
+
+PROJECT_ID = "fake-project"
+ORG_ID = "fake-org"
+
+
+class FakeStablyBackend:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.knowledge: List[dict] = []
+        self.calls: Counter = Counter()
+        self._ids = itertools.count(1)
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/api/fe/v1/login", self._login)
+        app.router.add_get("/api/v1/refresh_token", self._refresh_token)
+        app.router.add_route("*", "/api/trpc/{endpoint}", self._trpc)
+        app.router.add_get("/_stats", self._stats)
+        return app
+
+    async def _stats(self, request: web.Request) -> web.Response:
+        return web.json_response({"calls": dict(self.calls), "knowledge_items": len(self.knowledge)})
+
+    async def _login(self, request: web.Request) -> web.Response:
+        self.calls["auth.login"] += 1
+        response = web.json_response({})
+        response.set_cookie("refresh_token", "fake-refresh-token")
+        return response
+
+    async def _refresh_token(self, request: web.Request) -> web.Response:
+        self.calls["auth.refresh_token"] += 1
+        return web.json_response({
+            "access_token": "fake-access-token",
+            "user": {"metadata": {"activeOrgId": ORG_ID}},
+        })
+
+    async def _trpc(self, request: web.Request) -> web.Response:
+        endpoint = request.match_info["endpoint"]
+        if request.method == "POST":
+            payload = await request.json()
+        else:
+            payload = json.loads(request.query.get("input", "{}"))
+        args = payload.get("0", {}).get("json", {})
+        self.calls[endpoint] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return web.json_response([{"result": {"data": {"json": self._handle(endpoint, args)}}}])
+
+    def _handle(self, endpoint: str, args: dict):
+        if endpoint == "project.getDefaultProject":
+            return {"id": PROJECT_ID}
+        if endpoint == "knowledge.list":
+            return self.knowledge
+        if endpoint == "knowledge.createManualKnowledge":
+            self.knowledge.append({"id": f"k{next(self._ids)}", "content": args["content"]})
+            return {}
+        if endpoint == "knowledge.deleteKnowledgeItem":
+            self.knowledge = [k for k in self.knowledge if k["id"] != args["knowledgeItemId"]]
+            return {}
+        if endpoint == "knowledge.updateManualKnowledge":
+            for item in self.knowledge:
+                if item["id"] == args["knowledgeItemId"]:
+                    item["content"] = args["content"]
+            return {}
+        if endpoint == "knowledge.query":
+            return self._query(args["query"], args.get("topK"))
+        if endpoint == "testDraft.createTestDraft":
+            return {"id": f"draft{next(self._ids)}"}
+        if endpoint == "testDraft.publishTestDraft":
+            return {"testId": f"test{next(self._ids)}"}
+        if endpoint == "recorder.createRoom":
+            return f"room{next(self._ids)}"
+        return {}
+
+    def _query(self, query: str, top_k: Optional[int]) -> List[dict]:
+        # no embeddings here: recall queries (with topK) get the most recent items,
+        # duplicate/conflict queries only match items whose content appears verbatim
+        if top_k:
+            return self.knowledge[-top_k:]
+        return [k for k in self.knowledge if k["content"] in query]
+
+
+async def start(host: str, port: int, latency: float = 0.0) -> "tuple[web.AppRunner, FakeStablyBackend]":
+    backend = FakeStablyBackend(latency)
+    runner = web.AppRunner(backend.build_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner, backend
+
+
+async def _serve_forever(host: str, port: int, latency: float):
+    runner, _ = await start(host, port, latency)
+    print(f"Fake Stably backend listening on http://{host}:{port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake Stably backend for local load testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of delay added to each tRPC call")
+    args = parser.parse_args()
+    asyncio.run(_serve_forever(args.host, args.port, args.latency))
@@ -0,0 +1,51 @@
+import asyncio
+import math
+import os
+from typing import List, Optional
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile: the smallest value with at least ``pct`` percent of samples at or below it."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct * len(ordered) / 100) - 1))
+    return ordered[index]
+
+
+def read_rss(pid: int) -> Optional[int]:
+    """Resident set size in bytes, or None where /proc is unavailable."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def count_sockets(pid: int) -> Optional[int]:
+    """Number of open socket file descriptors, or None where /proc is unavailable."""
+    fd_dir = f"/proc/{pid}/fd"
+    try:
+        fds = os.listdir(fd_dir)
+    except OSError:
+        return None
+    count = 0
+    for fd in fds:
+        try:
+            if os.readlink(os.path.join(fd_dir, fd)).startswith("socket:"):
+                count += 1
+        except OSError:
+            continue
+    return count
+
+
+async def sample_loop_lag(samples: List[float], interval: float):
+    """Append how late each ``interval`` sleep wakes up on the running loop, until cancelled."""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - expected))
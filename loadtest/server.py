@@ -0,0 +1,47 @@
+import argparse
+import asyncio
+from typing import List
+
+from aiohttp import web
+
+import main
+from loadtest.metrics import sample_loop_lag
+
+# Runs the MCP server over HTTP for the loadtest CLI, plus a side endpoint that hands
+# out the server's own event-loop lag samples (GET /_lag returns and clears them).
+
+
+async def serve(transport: str, host: str, port: int, stats_port: int, interval: float):
+    lag: List[float] = []
+
+    async def pop_lag(request: web.Request) -> web.Response:
+        samples = lag[:]
+        lag.clear()
+        return web.json_response({"loop_lag": samples})
+
+    app = web.Application()
+    app.router.add_get("/_lag", pop_lag)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, stats_port).start()
+    sampler = asyncio.create_task(sample_loop_lag(lag, interval))
+    try:
+        # fastmcp defaults to a zero graceful-shutdown timeout, which logs an error on every SIGTERM
+        await main.mcp.run_http_async(
+            transport=transport, host=host, port=port, log_level="warning",
+            uvicorn_config={"timeout_graceful_shutdown": 5},
+        )
+    finally:
+        sampler.cancel()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the MCP server over HTTP with an event-loop lag endpoint.")
+    parser.add_argument("--transport", choices=["sse", "streamable-http"], default="sse")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--stats-port", type=int, default=8001)
+    parser.add_argument("--sample-interval", type=float, default=0.05, help="seconds between event-loop lag samples")
+    args = parser.parse_args()
+    asyncio.run(serve(args.transport, args.host, args.port, args.stats_port, args.sample_interval))
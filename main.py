@@ -1,15 +1,16 @@
 from contextlib import asynccontextmanager
 from collections.abc import AsyncIterator
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from fastmcp import FastMCP, Context
 import os
 import asyncio
-from typing import List, Optional
+from typing import List
 import aiohttp
 import ngrok
 from dotenv import load_dotenv
 from lib.stably_api import StablyAPI
 from lib.auth import StablyAuth
+from lib.session_state import SessionState, SessionStore
 from lib import prompt
 
 load_dotenv()
@@ -18,9 +19,7 @@ NGROK_ENABLED = os.environ.get("NGROK_ENABLED", "false").lower() == "true"
 @dataclass
 class AppContext:
     api: StablyAPI
-    testing_url: Optional[str] = None
-    testing_account: Optional[str] = None
-    may_need_a_testing_account: Optional[bool] = False
+    sessions: SessionStore = field(default_factory=SessionStore)
 
 @asynccontextmanager
 async def app_lifespan(server: FastMCP) -> AsyncIterator[AppContext]:
@@ -71,6 +70,22 @@ async def get_user_tutorial(suggested_qa_tests_to_create: List[str], suggested_k
         suggested_knowledge_to_set='\n'.join(suggested_knowledge_to_set)
     )
 
+def get_session_state(ctx: Context) -> SessionState:
+    """Return the state of the client session issuing this tool call."""
+    return ctx.request_context.lifespan_context.sessions.get(ctx.session)
+
+async def persist_testing_url(ctx: Context, state: SessionState, url: str, may_need_a_testing_account: bool) -> None:
+    """Save testing url knowledge, merging identical writes that overlap in time."""
+    knowledge = (url, may_need_a_testing_account)
+    app = ctx.request_context.lifespan_context
+    # written outside the session lock so overlapping calls can share one backend request
+    await app.sessions.coalesce(
+        ("testing_url", *knowledge),
+        lambda: app.api.set_testing_url_knowledge(url, may_need_a_testing_account),
+    )
+    async with state.lock:
+        state.update(persisted_testing_url=knowledge, persisted_at_version=state.snapshot.version + 1)
+
 @mcp.tool(description=prompt.TESTING_URL_TOOL_DESCRIPTION)
 async def set_testing_url(ctx: Context, user_provided_url: str, may_need_a_testing_account: bool) -> str:
     # check if user_provided_url is provided
@@ -79,28 +94,32 @@ async def set_testing_url(ctx: Context, user_provided_url: str, may_need_a_testi
     # verify if user_provided_url is a valid url
     if not (user_provided_url.startswith("http://") or user_provided_url.startswith("https://")):
         return prompt.INVALID_URL
-    ctx.request_context.lifespan_context.testing_url = user_provided_url
-    ctx.request_context.lifespan_context.may_need_a_testing_account = may_need_a_testing_account
-    api = ctx.request_context.lifespan_context.api
-    await api.set_testing_url_knowledge(user_provided_url, may_need_a_testing_account)
-    if may_need_a_testing_account and not ctx.request_context.lifespan_context.testing_account:
+    state = get_session_state(ctx)
+    async with state.lock:
+        state.update(testing_url=user_provided_url, may_need_a_testing_account=may_need_a_testing_account)
+    await persist_testing_url(ctx, state, user_provided_url, may_need_a_testing_account)
+    if may_need_a_testing_account and not state.snapshot.testing_account:
         return prompt.URL_SAVED_AND_GET_TESTING_ACCOUNT
     return prompt.TESTING_URL_UPDATED
 
 @mcp.tool(description=prompt.TESTING_ACCOUNT_TOOL_DESCRIPTION)
 async def set_testing_account(ctx: Context, testing_account: str) -> str:
-    ctx.request_context.lifespan_context.testing_account = testing_account
-    api = ctx.request_context.lifespan_context.api
-    if ctx.request_context.lifespan_context.testing_url:
-        await api.set_testing_account_knowledge(testing_account, ctx.request_context.lifespan_context.testing_url)
-    else:
-        await api.set_testing_account_knowledge(testing_account)
+    app = ctx.request_context.lifespan_context
+    state = get_session_state(ctx)
+    async with state.lock:
+        testing_url = state.update(testing_account=testing_account).testing_url
+    await app.sessions.coalesce(
+        ("testing_account", testing_account, testing_url),
+        lambda: app.api.set_testing_account_knowledge(testing_account, testing_url),
+    )
     return prompt.TESTING_ACCOUNT_UPDATED
 
 @mcp.tool(description=prompt.TEST_CREATION_TOOL_DESCRIPTION)
 async def add_e2e_test(ctx: Context,
                        multi_step_test_description: List[str]) -> str:
     api = ctx.request_context.lifespan_context.api
+    state = get_session_state(ctx)
+    seen_version = state.snapshot.version
 
     # get existing knowledge
     existing_knowledge = await asyncio.gather(*[api.retrieve_testing_urls(), api.retrieve_testing_account_knowledge()])
@@ -108,15 +127,19 @@ async def add_e2e_test(ctx: Context,
     existing_testing_urls, existing_testing_account_knowledge = existing_knowledge
     if existing_testing_urls:
         url = existing_testing_urls[-1]
-    elif ctx.request_context.lifespan_context.testing_url:
-        url = ctx.request_context.lifespan_context.testing_url
-        may_need_a_testing_account = ctx.request_context.lifespan_context.may_need_a_testing_account
-        await api.set_testing_url_knowledge(ctx.request_context.lifespan_context.testing_url, may_need_a_testing_account)
+        snapshot = state.snapshot
+    elif state.snapshot.testing_url:
+        snapshot = state.snapshot
+        url = snapshot.testing_url
+        knowledge = (url, snapshot.may_need_a_testing_account)
+        # the backend did not return the url, so save it unless a write finished after the lookup started
+        if snapshot.persisted_testing_url != knowledge or snapshot.persisted_at_version <= seen_version:
+            await persist_testing_url(ctx, state, *knowledge)
     else:
         return prompt.STOP_AND_GET_TESTING_URL
 
     # if testing account is needed, check if it is provided
-    if not existing_testing_account_knowledge and ctx.request_context.lifespan_context.may_need_a_testing_account:
+    if not existing_testing_account_knowledge and snapshot.may_need_a_testing_account:
         return prompt.STOP_AND_GET_TESTING_ACCOUNT
         
     if NGROK_ENABLED and ("localhost" in url or "127.0.0.1" in url):
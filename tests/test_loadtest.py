@@ -0,0 +1,74 @@
+import os
+import socket
+
+import pytest
+
+from loadtest.fake_backend import PROJECT_ID, FakeStablyBackend
+from loadtest.metrics import count_sockets, percentile, read_rss
+
+
+def test_percentile_odd_sample_count():
+    values = [5, 1, 4, 2, 3]
+    assert percentile(values, 50) == 3
+    assert percentile(values, 95) == 5
+    assert percentile(values, 100) == 5
+    assert percentile(values, 1) == 1
+
+
+def test_percentile_even_sample_count():
+    values = [4, 1, 3, 2]
+    assert percentile(values, 50) == 2
+    assert percentile(values, 75) == 3
+    assert percentile(values, 76) == 4
+
+
+def test_percentile_tail_rank():
+    values = list(range(1, 151))
+    assert percentile(values, 99) == 149
+    assert percentile(values, 95) == 143
+    assert percentile(list(range(1, 101)), 99) == 99
+
+
+def test_percentile_empty():
+    assert percentile([], 99) == 0.0
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc")
+def test_process_metrics_track_own_process():
+    assert read_rss(os.getpid()) > 0
+    before = count_sockets(os.getpid())
+    with socket.socket():
+        assert count_sockets(os.getpid()) == before + 1
+
+
+def test_fake_backend_knowledge_round_trip():
+    backend = FakeStablyBackend()
+    assert backend._handle("project.getDefaultProject", {"teamId": "org"}) == {"id": PROJECT_ID}
+    for content in ["first", "second", "third"]:
+        backend._handle("knowledge.createManualKnowledge", {"projectId": PROJECT_ID, "content": content})
+    items = backend._handle("knowledge.list", {"projectId": PROJECT_ID})
+    assert [item["content"] for item in items] == ["first", "second", "third"]
+
+    backend._handle("knowledge.updateManualKnowledge", {"knowledgeItemId": items[0]["id"], "content": "updated"})
+    backend._handle("knowledge.deleteKnowledgeItem", {"knowledgeItemId": items[1]["id"]})
+    assert [item["content"] for item in backend.knowledge] == ["updated", "third"]
+
+
+def test_fake_backend_query():
+    backend = FakeStablyBackend()
+    for content in ["[Usage] login flow", "[Usage] checkout flow", "[Usage] search flow"]:
+        backend._handle("knowledge.createManualKnowledge", {"content": content})
+    # recall queries return the most recent items
+    recalled = backend._handle("knowledge.query", {"query": "anything", "topK": 2})
+    assert [item["content"] for item in recalled] == ["[Usage] checkout flow", "[Usage] search flow"]
+    # duplicate/conflict queries only match contents quoted in the query
+    duplicates = backend._handle("knowledge.query", {"query": "Retrieve duplicates of: [Usage] checkout flow"})
+    assert [item["content"] for item in duplicates] == ["[Usage] checkout flow"]
+
+
+def test_fake_backend_test_creation_ids_are_unique():
+    backend = FakeStablyBackend()
+    first = backend._handle("testDraft.createTestDraft", {"websiteUnderTest": "https://example.com"})
+    second = backend._handle("testDraft.createTestDraft", {"websiteUnderTest": "https://example.com"})
+    assert first["id"] != second["id"]
+    assert backend._handle("project.addProjectWebsite", {"url": "https://example.com"}) == {}
@@ -0,0 +1,145 @@
+import asyncio
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from lib.session_state import SessionState, SessionStore
+
+
+class FakeAPI:
+    """Counts knowledge writes; the backend starts without any saved testing url."""
+
+    def __init__(self, latency: float = 0.01, lookup_latency: float = 0.01):
+        self.latency = latency
+        self.lookup_latency = lookup_latency
+        self.calls = Counter()
+        self.testing_urls = []
+
+    async def set_testing_url_knowledge(self, testing_url, may_need_a_testing_account):
+        self.calls["set_testing_url_knowledge"] += 1
+        await asyncio.sleep(self.latency)
+        return 1
+
+    async def set_testing_account_knowledge(self, testing_account_information, testing_url=None):
+        self.calls["set_testing_account_knowledge"] += 1
+        await asyncio.sleep(self.latency)
+        return 1
+
+    async def retrieve_testing_urls(self):
+        await asyncio.sleep(self.lookup_latency)
+        return list(self.testing_urls)
+
+    async def retrieve_testing_account_knowledge(self, testing_url=None):
+        return []
+
+    async def add_e2e_test(self, url, prompt, publish=False):
+        self.calls["add_e2e_test"] += 1
+        return f"{url}/test"
+
+
+class FakeSession:
+    """Stands in for the MCP ServerSession the tools key their state on."""
+
+
+def make_ctx(api):
+    app = main.AppContext(api=api)
+    return SimpleNamespace(request_context=SimpleNamespace(lifespan_context=app), session=FakeSession())
+
+
+def test_update_requires_lock():
+    state = SessionState()
+    with pytest.raises(RuntimeError):
+        state.update(testing_url="https://example.com")
+
+
+def test_update_publishes_new_snapshot_version():
+    async def scenario():
+        state = SessionState()
+        before = state.snapshot
+        async with state.lock:
+            after = state.update(testing_url="https://example.com")
+        return before, after
+
+    before, after = asyncio.run(scenario())
+    assert before.testing_url is None
+    assert after.version == before.version + 1
+    assert after.testing_url == "https://example.com"
+
+
+def test_coalesce_merges_concurrent_identical_calls():
+    calls = Counter()
+
+    async def write(key):
+        calls[key] += 1
+        await asyncio.sleep(0.01)
+        return key
+
+    async def scenario():
+        store = SessionStore()
+        results = await asyncio.gather(
+            *[store.coalesce("a", lambda: write("a")) for _ in range(5)],
+            store.coalesce("b", lambda: write("b")),
+        )
+        # a later, non-overlapping call runs again
+        await store.coalesce("a", lambda: write("a"))
+        return results
+
+    assert asyncio.run(scenario()) == ["a"] * 5 + ["b"]
+    assert calls == {"a": 2, "b": 1}
+
+
+def test_overlapping_set_testing_url_writes_once():
+    api = FakeAPI()
+    ctx = make_ctx(api)
+
+    async def scenario():
+        await asyncio.gather(*[main.set_testing_url(ctx, "https://example.com", False) for _ in range(5)])
+
+    asyncio.run(scenario())
+    assert api.calls["set_testing_url_knowledge"] == 1
+
+
+def test_overlapping_add_e2e_test_fallback_writes_once():
+    api = FakeAPI()
+    ctx = make_ctx(api)
+
+    async def scenario():
+        state = main.get_session_state(ctx)
+        async with state.lock:
+            state.update(testing_url="https://example.com")
+        await asyncio.gather(*[main.add_e2e_test(ctx, ["Open the home page"]) for _ in range(5)])
+
+    asyncio.run(scenario())
+    assert api.calls["set_testing_url_knowledge"] == 1
+    assert api.calls["add_e2e_test"] == 5
+
+
+def test_sequential_calls_write_the_url_again():
+    # the backend lost the url between calls, so each call has to save it again
+    api = FakeAPI()
+    ctx = make_ctx(api)
+
+    async def scenario():
+        await main.set_testing_url(ctx, "https://example.com", False)
+        await main.set_testing_url(ctx, "https://example.com", False)
+        await main.add_e2e_test(ctx, ["Open the home page"])
+
+    asyncio.run(scenario())
+    assert api.calls["set_testing_url_knowledge"] == 3
+
+
+def test_add_e2e_test_skips_url_saved_during_lookup():
+    api = FakeAPI(lookup_latency=0.1)
+    ctx = make_ctx(api)
+
+    async def scenario():
+        test = asyncio.create_task(main.add_e2e_test(ctx, ["Open the home page"]))
+        await asyncio.sleep(0)
+        # finishes while add_e2e_test is still waiting on retrieve_testing_urls
+        await main.set_testing_url(ctx, "https://example.com", False)
+        return await test
+
+    asyncio.run(scenario())
+    assert api.calls["set_testing_url_knowledge"] == 1